@@ -1,8 +1,13 @@
-import os
 import asyncio
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from utils.logger import get_logger
+from utils.cache_utils import CacheUtils
+from utils.akshare_utils import get_akshare
+from utils.dataframe_utils import DataFrameUtils
+from utils.search_utils import SearchUtils
 from datetime import datetime, timedelta
 
 # 获取日志器
@@ -19,27 +24,56 @@ class AStockServiceAsync:
         logger.debug("初始化AStockServiceAsync")
         
         # 可选：添加缓存以减少频繁请求
-        self.cache_file = 'data/all_a_stock.csv'
-        self.cache = None
+        self.cache_file = 'data/all_a_stock.parquet'
         self.cache_timestamp = None
         self.cache_duration = timedelta(days=5)
+        # 股票代码 -> 行号索引，随缓存一起重建
+        self._symbol_index = {}
+        # 代码、名称及小写名称数组，搜索和详情查询直接使用，无需访问DataFrame
+        self._symbols = np.array([], dtype=object)
+        self._names = np.array([], dtype=object)
+        self._names_lower = np.array([], dtype=object)
+        # 拼接后的小写名称，子串搜索直接在整个字符串上查找
+        self._names_blob = SearchUtils.build_blob([])
+        # 缓存失效时保证只有一个请求从API刷新数据
+        self._refresh_lock = asyncio.Lock()
+        # akshare调用使用独立线程池，避免占满默认线程池影响其他阻塞调用
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='akshare')
 
-        if os.path.exists(self.cache_file):
-            df = pd.read_csv(self.cache_file, dtype={'symbol': str})
-            if len('日期') > 0:
-                str_date = df['日期'].iloc[0]
-                df.pop('日期')
-                self.cache = df 
-                date_format = '%Y-%m-%d %H:%M:%S'
-                self.cache_timestamp = datetime.strptime(str_date, date_format)
-                logger.info(f'A股缓存数据，日期：{str(self.cache_timestamp)}')
+        df, timestamp = CacheUtils.read_parquet(self.cache_file, columns=['symbol', 'name'], legacy_csv='data/all_a_stock.csv')
+        if df is not None:
+            self._set_cache(df, timestamp)
+            logger.info(f'A股缓存数据，日期：{str(self.cache_timestamp)}')
+
+    def close(self) -> None:
+        """
+        关闭akshare线程池，在应用退出时调用
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_cache(self, df: pd.DataFrame, timestamp: datetime) -> None:
+        """
+        更新缓存数据，并重建股票代码索引
+
+        只保留搜索和详情查询使用的数组，不保留DataFrame
+        
+        Args:
+            df: A股数据
+            timestamp: 缓存刷新时间
+        """
+        self.cache_timestamp = timestamp
+        self._symbols = df['symbol'].fillna('').astype(str).to_numpy()
+        self._names = df['name'].fillna('').to_numpy()
+        self._names_lower = np.array([name.lower() for name in self._names], dtype=object)
+        self._names_blob = SearchUtils.build_blob(self._names_lower)
+        self._symbol_index = dict(zip(self._symbols, range(len(self._symbols))))
 
     async def search_stocks(self, keyword: str) -> List[Dict[str, Any]]:
         """
         异步搜索A股代码
         
         Args:
-            keyword: 搜索关键词
+            keyword: 搜索关键词，多个关键词用逗号分隔，匹配任一关键词即可
             
         Returns:
             匹配的股票列表
@@ -47,22 +81,14 @@ class AStockServiceAsync:
         try:
             logger.info(f"异步搜索A: {keyword}")
             
-            df = await asyncio.to_thread(self._get_all_stocks_data)
+            await self._get_stocks_data()
 
-            # 模糊匹配搜索
-            mask = df['name'].str.contains(keyword, case=False, na=False)
-            results = df[mask]
-            
-            # 格式化返回结果并处理 NaN 值
-            formatted_results = []
-            for _, row in results.iterrows():
-                formatted_results.append({
-                    'name': row['name'] if pd.notna(row['name']) else '',
-                    'symbol': str(row['symbol']) if pd.notna(row['symbol']) else '',
-                })
-                # 限制只返回前10个结果
-                if len(formatted_results) >= 10:
-                    break
+            # 模糊匹配搜索，限制只返回前10个结果
+            idx = SearchUtils.match(keyword, self._names_lower, 10, self._names_blob)
+            formatted_results = [
+                {'name': name, 'symbol': symbol}
+                for name, symbol in zip(self._names[idx], self._symbols[idx])
+            ]
             
             logger.info(f"A股搜索完成，找到 {len(formatted_results)} 个匹配项（限制显示前10个）")
             return formatted_results
@@ -73,21 +99,45 @@ class AStockServiceAsync:
             logger.exception(e)
             raise Exception(error_msg)
     
-    def _get_all_stocks_data(self) -> pd.DataFrame:
+    def _is_cache_valid(self) -> bool:
+        """
+        检查A股缓存是否存在且未过期
+        """
+        return self.cache_timestamp is not None and (datetime.now() - self.cache_timestamp) < self.cache_duration
+
+    async def _get_stocks_data(self) -> None:
+        """
+        异步获取A股数据，支持缓存
+        
+        缓存失效时只由一个请求从API刷新，并发的其他请求等待并复用刷新结果
+        """
+        if self._is_cache_valid():
+            logger.debug("使用A股所有数据缓存数据")
+            return
+
+        async with self._refresh_lock:
+            # 等待锁期间缓存可能已被其他请求刷新
+            if self._is_cache_valid():
+                return
+
+            now = datetime.now()
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(self._executor, self._get_all_stocks_data, now)
+            self._set_cache(df, now)
+
+    def _get_all_stocks_data(self, now: datetime) -> pd.DataFrame:
         """
-        获取A股数据（同步方法，将被异步方法调用）
+        从API获取A股数据并写入缓存文件（同步方法，将被异步方法调用）
         
+        Args:
+            now: 缓存刷新时间
+            
         Returns:
             包含A股数据的DataFrame
         """
-        import akshare as ak
+        ak = get_akshare()
         
         try:
-            now = datetime.now()
-            if self.cache is not None and (now - self.cache_timestamp) < self.cache_duration:
-                logger.debug("使用A股所有数据缓存数据")
-                return self.cache
-            
             logger.debug(f"从API获取A股所有数据")
 
             # 获取A股数据
@@ -101,11 +151,8 @@ class AStockServiceAsync:
 
             # 删除 'name' 列中字符串开头和结尾的空格
             df['name'] = df['name'].str.replace(' ', '')
-            df['日期'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-            df.to_csv(self.cache_file, index=False)
-            df.pop('日期')
-            self.cache = df
-            self.cache_timestamp = now
+            df = DataFrameUtils.compress(df, ['name', 'symbol'])
+            CacheUtils.write_parquet(df, self.cache_file, now)
             return df
             
         except Exception as e:
@@ -120,7 +167,7 @@ class AStockServiceAsync:
         Returns:
             包含A股数据的DataFrame
         """
-        import akshare as ak
+        ak = get_akshare()
         
         try:
             # 获取A股数据
@@ -151,12 +198,12 @@ class AStockServiceAsync:
         try:
             logger.info(f"获取A股详情: {symbol}")
             
-            # 使用线程池执行同步的akshare调用
-            df = await asyncio.to_thread(self._get_all_stocks_data)
-            result = df.loc[df['symbol'] == symbol]
-            if len(result) == 0:
+            # 缓存失效时先刷新，之后直接在缓存的数组中查询
+            await self._get_stocks_data()
+            idx = self._symbol_index.get(symbol)
+            if idx is None:
                 raise Exception(f"未找到股票代码{symbol}的股票简称")
-            stock_name = result['name'].values[0]
+            stock_name = self._names[idx]
 
             # 格式化为字典
             stock_detail = {
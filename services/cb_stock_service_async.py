@@ -1,8 +1,10 @@
-import os
 import asyncio
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from utils.logger import get_logger
+from utils.cache_utils import CacheUtils
+from utils.akshare_utils import get_akshare
 from datetime import datetime, timedelta
 
 # 获取日志器
@@ -19,20 +21,24 @@ class CBStockServiceAsync:
         logger.debug("初始化AStockServiceAsync")
         
         # 可选：添加缓存以减少频繁请求
-        self.cache_file = 'data/all_cb_stock.csv'
+        self.cache_file = 'data/all_cb_stock.parquet'
         self.cache = None
         self.cache_timestamp = None
         self.cache_duration = timedelta(days=5)
+        # akshare调用使用独立线程池，避免占满默认线程池影响其他阻塞调用
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='akshare')
 
-        if os.path.exists(self.cache_file):
-            df = pd.read_csv(self.cache_file, dtype={'symbol': str})
-            if len('日期') > 0:
-                str_date = df['日期'].iloc[0]
-                df.pop('日期')
-                self.cache = df 
-                date_format = '%Y-%m-%d %H:%M:%S'
-                self.cache_timestamp = datetime.strptime(str_date, date_format)
-                logger.info(f'可转债缓存数据，日期：{str(self.cache_timestamp)}')
+        df, timestamp = CacheUtils.read_parquet(self.cache_file, legacy_csv='data/all_cb_stock.csv')
+        if df is not None:
+            self.cache = df
+            self.cache_timestamp = timestamp
+            logger.info(f'可转债缓存数据，日期：{str(self.cache_timestamp)}')
+
+    def close(self) -> None:
+        """
+        关闭akshare线程池，在应用退出时调用
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
     async def search_bonds(self, keyword: str) -> List[Dict[str, Any]]:
         """
@@ -47,7 +53,8 @@ class CBStockServiceAsync:
         try:
             logger.info(f"异步搜索A: {keyword}")
             
-            df = await asyncio.to_thread(self._get_all_bonds_data)
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(self._executor, self._get_all_bonds_data)
 
             # 模糊匹配搜索
             mask = df['name'].str.contains(keyword, case=False, na=False)
@@ -80,14 +87,14 @@ class CBStockServiceAsync:
         Returns:
             包含可转债数据的DataFrame
         """
-        import akshare as ak
-        
         try:
             now = datetime.now()
             if self.cache is not None and (now - self.cache_timestamp) < self.cache_duration:
                 logger.debug("使用可转债所有数据缓存数据")
                 return self.cache
              
+            # 缓存命中时不导入akshare
+            ak = get_akshare()
             logger.debug(f"从API获取可转债所有数据")
 
             # 获取可转债数据
@@ -100,10 +107,7 @@ class CBStockServiceAsync:
                 ]
             ]
 
-            # 删除 'name' 列中字符串开头和结尾的空格
-            df['日期'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-            df.to_csv(self.cache_file, index=False)
-            df.pop('日期')
+            CacheUtils.write_parquet(df, self.cache_file, now)
             self.cache = df
             self.cache_timestamp = now
             return df
@@ -127,7 +131,8 @@ class CBStockServiceAsync:
             logger.info(f"获取可转债详情: {symbol}")
             
             # 使用线程池执行同步的akshare调用
-            df = await asyncio.to_thread(self._get_all_bonds_data)
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(self._executor, self._get_all_bonds_data)
             result = df.loc[df['symbol'] == symbol.lower()]
             if len(result) == 0:
                 raise Exception(f"未找到股票代码{symbol}的股票简称")
@@ -1,13 +1,25 @@
-import os
 import asyncio
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from utils.logger import get_logger
+from utils.cache_utils import CacheUtils
+from utils.akshare_utils import get_akshare
+from utils.dataframe_utils import DataFrameUtils
 from datetime import datetime, timedelta
 
 # 获取日志器
 logger = get_logger()
 
+# 基金缓存中保留的列
+LOF_NUMERIC_COLUMNS = ['price', 'price_change', 'price_change_percent', 'volume', 'market_value', 'total_value']
+ETF_NUMERIC_COLUMNS = LOF_NUMERIC_COLUMNS + ['discount_rate']
+LOF_COLUMNS = ['symbol', 'name'] + LOF_NUMERIC_COLUMNS
+ETF_COLUMNS = ['symbol', 'name'] + ETF_NUMERIC_COLUMNS
+# 搜索结果中返回的数值列
+SEARCH_NUMERIC_COLUMNS = ['price', 'volume', 'market_value', 'total_value']
+
 class FundServiceAsync:
     """
     异步基金服务
@@ -19,33 +31,57 @@ class FundServiceAsync:
         logger.debug("初始化FundServiceAsync")
         
         # 添加缓存
-        self.etf_cache_file = 'data/all_etf_stock.csv'
-        self.lof_cache_file = 'data/all_lof_stock.csv'
+        self.etf_cache_file = 'data/all_etf_stock.parquet'
+        self.lof_cache_file = 'data/all_lof_stock.parquet'
         self.etf_cache = None
         self.lof_cache = None
         self.etf_cache_timestamp = None
         self.lof_cache_timestamp = None
         self.cache_duration = timedelta(days=5)  # 缓存30分钟
+        # 基金代码 -> 行号索引，按市场类型分别维护
+        self._symbol_index = {'ETF': {}, 'LOF': {}}
+        # 小写的基金名称和代码，用于搜索时的子串匹配
+        self._names_lower = {'ETF': np.array([], dtype=object), 'LOF': np.array([], dtype=object)}
+        self._symbols_lower = {'ETF': np.array([], dtype=object), 'LOF': np.array([], dtype=object)}
+        # 缓存失效时保证每个市场只有一个请求从API刷新数据
+        self._refresh_locks = {'ETF': asyncio.Lock(), 'LOF': asyncio.Lock()}
+        # akshare调用使用独立线程池，避免占满默认线程池影响其他阻塞调用
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='akshare')
 
-        if os.path.exists(self.etf_cache_file):
-            df = pd.read_csv(self.etf_cache_file, dtype={'symbol': str})
-            if len('日期') > 0:
-                str_date = df['日期'].iloc[0]
-                df.pop('日期')
-                self.etf_cache = df 
-                date_format = '%Y-%m-%d %H:%M:%S'
-                self.etf_cache_timestamp = datetime.strptime(str_date, date_format)
-                logger.info(f'ETF缓存数据，日期：{str(self.etf_cache_timestamp)}')
+        df, timestamp = CacheUtils.read_parquet(self.etf_cache_file, columns=ETF_COLUMNS, legacy_csv='data/all_etf_stock.csv')
+        if df is not None:
+            self._set_cache('ETF', df, timestamp)
+            logger.info(f'ETF缓存数据，日期：{str(self.etf_cache_timestamp)}')
 
-        if os.path.exists(self.lof_cache_file):
-            df = pd.read_csv(self.lof_cache_file, dtype={'symbol': str})
-            if len('日期') > 0:
-                str_date = df['日期'].iloc[0]
-                df.pop('日期')
-                self.lof_cache = df 
-                date_format = '%Y-%m-%d %H:%M:%S'
-                self.lof_cache_timestamp = datetime.strptime(str_date, date_format)
-                logger.info(f'LOF缓存数据，日期：{str(self.lof_cache_timestamp)}')
+        df, timestamp = CacheUtils.read_parquet(self.lof_cache_file, columns=LOF_COLUMNS, legacy_csv='data/all_lof_stock.csv')
+        if df is not None:
+            self._set_cache('LOF', df, timestamp)
+            logger.info(f'LOF缓存数据，日期：{str(self.lof_cache_timestamp)}')
+
+    def close(self) -> None:
+        """
+        关闭akshare线程池，在应用退出时调用
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_cache(self, market_type: str, df: pd.DataFrame, timestamp: datetime) -> None:
+        """
+        更新基金缓存数据，并重建基金代码索引
+        
+        Args:
+            market_type: 市场类型，'ETF'或'LOF'
+            df: 基金数据
+            timestamp: 缓存刷新时间
+        """
+        if market_type == 'ETF':
+            self.etf_cache = df
+            self.etf_cache_timestamp = timestamp
+        else:
+            self.lof_cache = df
+            self.lof_cache_timestamp = timestamp
+        self._symbol_index[market_type] = dict(zip(df['symbol'].values, range(len(df))))
+        self._names_lower[market_type] = df['name'].fillna('').str.lower().to_numpy()
+        self._symbols_lower[market_type] = df['symbol'].fillna('').str.lower().to_numpy()
 
     async def search_funds(self, keyword: str, market_type: str = 'ETF') -> List[Dict[str, Any]]:
         """
@@ -65,24 +101,22 @@ class FundServiceAsync:
             df = await self._get_funds_data(market_type)
             
             # 模糊匹配搜索（同时匹配代码和名称）
-            mask = (df['name'].str.contains(keyword, case=False, na=False) | 
-                   df['symbol'].str.contains(keyword, case=False, na=False))
-            results = df[mask]
-            
-            # 格式化返回结果并处理 NaN 值
-            formatted_results = []
-            for _, row in results.iterrows():
-                formatted_results.append({
-                    'name': row['name'] if pd.notna(row['name']) else '',
-                    'symbol': str(row['symbol']) if pd.notna(row['symbol']) else '',
-                    'price': float(row['price']) if pd.notna(row['price']) else 0.0,
-                    'volume': float(row['volume']) if pd.notna(row['volume']) else 0.0,
-                    'market_value': float(row['market_value']) if pd.notna(row['market_value']) else 0.0,
-                    'total_value': float(row['total_value']) if pd.notna(row['total_value']) else 0.0,
-                })
-                # 限制只返回前10个结果
-                if len(formatted_results) >= 20:
-                    break
+            kw = keyword.lower()
+            market_type = 'ETF' if market_type == 'ETF' else 'LOF'
+            names_lower = self._names_lower[market_type]
+            symbols_lower = self._symbols_lower[market_type]
+            mask = np.fromiter(
+                (kw in name or kw in symbol for name, symbol in zip(names_lower, symbols_lower)),
+                dtype=bool, count=len(names_lower)
+            )
+            
+            # 限制只返回前20个结果，格式化返回结果并处理 NaN 值
+            idx = np.flatnonzero(mask)[:20]
+            top = df.iloc[idx][['name', 'symbol'] + SEARCH_NUMERIC_COLUMNS]
+            top = top.fillna({'name': '', 'symbol': ''}).fillna(0.0)
+            top['symbol'] = top['symbol'].astype(str)
+            top[SEARCH_NUMERIC_COLUMNS] = top[SEARCH_NUMERIC_COLUMNS].astype(float)
+            formatted_results = top.to_dict('records')
             
             logger.info(f"基金搜索完成，找到 {len(formatted_results)} 个匹配项（限制显示前10个）")
             return formatted_results
@@ -93,54 +127,73 @@ class FundServiceAsync:
             logger.exception(e)
             raise Exception(error_msg)
     
-    async def _get_funds_data(self, market_type: str = 'ETF') -> pd.DataFrame:
+    def _get_valid_cache(self, market_type: str) -> Optional[pd.DataFrame]:
         """
-        异步获取基金数据，支持缓存
+        获取未过期的基金缓存
         
         Args:
             market_type: 市场类型，'ETF'或'LOF'
             
         Returns:
-            包含基金数据的DataFrame
+            缓存的DataFrame，缓存不存在或已过期时返回None
         """
-
-        now = datetime.now()
         if market_type == 'ETF':
-            if self.etf_cache is not None and (now - self.etf_cache_timestamp) < self.cache_duration:
-                logger.debug("使用ETF所有数据缓存数据")
-                return self.etf_cache
+            cache, timestamp = self.etf_cache, self.etf_cache_timestamp
+        else:
+            cache, timestamp = self.lof_cache, self.lof_cache_timestamp
+
+        if cache is not None and (datetime.now() - timestamp) < self.cache_duration:
+            return cache
+        return None
 
-        if market_type == 'LOF':
-            if self.lof_cache is not None and (now - self.lof_cache_timestamp) < self.cache_duration:
-                logger.debug("使用LOF所有数据缓存数据")
-                return self.lof_cache
+    async def _get_funds_data(self, market_type: str = 'ETF') -> pd.DataFrame:
+        """
+        异步获取基金数据，支持缓存
         
-        # 缓存无效，重新获取数据
-        try:
-            logger.debug(f"从API获取{market_type}数据")
-            
-            # 使用线程池执行同步的akshare调用
-            if market_type == 'ETF':
-                df = await asyncio.to_thread(self._get_etf_data)
-                df['日期'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                df.to_csv(self.etf_cache_file, index=False)
-                df.pop('日期')
-                self.etf_cache = df
-                self.etf_cache_timestamp = now
-            else:
-                df = await asyncio.to_thread(self._get_lof_data)
-                df['日期'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                df.to_csv(self.lof_cache_file, index=False)
-                df.pop('日期')
-                self.lof_cache = df
-                self.lof_cache_timestamp = now
+        缓存失效时只由一个请求从API刷新，并发的其他请求等待并复用刷新结果
+        
+        Args:
+            market_type: 市场类型，'ETF'或'LOF'
             
+        Returns:
+            包含基金数据的DataFrame
+        """
+        market_type = 'ETF' if market_type == 'ETF' else 'LOF'
+
+        df = self._get_valid_cache(market_type)
+        if df is not None:
+            logger.debug(f"使用{market_type}所有数据缓存数据")
             return df
-            
-        except Exception as e:
-            logger.error(f"获取{market_type}数据失败: {str(e)}")
-            logger.exception(e)
-            raise
+
+        async with self._refresh_locks[market_type]:
+            # 等待锁期间缓存可能已被其他请求刷新
+            df = self._get_valid_cache(market_type)
+            if df is not None:
+                return df
+
+            # 缓存无效，重新获取数据
+            try:
+                logger.debug(f"从API获取{market_type}数据")
+                now = datetime.now()
+                
+                # 使用线程池执行同步的akshare调用
+                loop = asyncio.get_running_loop()
+                if market_type == 'ETF':
+                    df = await loop.run_in_executor(self._executor, self._get_etf_data)
+                    cache_file = self.etf_cache_file
+                else:
+                    df = await loop.run_in_executor(self._executor, self._get_lof_data)
+                    cache_file = self.lof_cache_file
+                # 写缓存文件是同步I/O，同样放到线程池执行
+                await loop.run_in_executor(self._executor, CacheUtils.write_parquet, df, cache_file, now)
+                self._set_cache(market_type, df, now)
+                
+                return df
+                
+            except Exception as e:
+                logger.error(f"获取{market_type}数据失败: {str(e)}")
+                logger.exception(e)
+                raise
     
     def _get_etf_data(self) -> pd.DataFrame:
         """
@@ -149,7 +202,7 @@ class FundServiceAsync:
         Returns:
             包含ETF数据的DataFrame
         """
-        import akshare as ak
+        ak = get_akshare()
         
         try:
             # 获取ETF基金数据
@@ -168,6 +221,9 @@ class FundServiceAsync:
                 "基金折价率": "discount_rate",
             })
             
+            df = DataFrameUtils.compress(df[ETF_COLUMNS], ['name', 'symbol'])
+            # 数值列统一转换为数值类型，无法解析的值记为NaN
+            df[ETF_NUMERIC_COLUMNS] = df[ETF_NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce')
             return df
             
         except Exception as e:
@@ -182,7 +238,7 @@ class FundServiceAsync:
         Returns:
             包含LOF数据的DataFrame
         """
-        import akshare as ak
+        ak = get_akshare()
         
         try:
             # 获取LOF基金数据
@@ -200,6 +256,9 @@ class FundServiceAsync:
                 "总市值": "total_value",
             })
             
+            df = DataFrameUtils.compress(df[LOF_COLUMNS], ['name', 'symbol'])
+            # 数值列统一转换为数值类型，无法解析的值记为NaN
+            df[LOF_NUMERIC_COLUMNS] = df[LOF_NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce')
             return df
             
         except Exception as e:
@@ -225,13 +284,12 @@ class FundServiceAsync:
             df = await self._get_funds_data(market_type)
             
             # 精确匹配基金代码
-            result = df[df['symbol'] == symbol]
+            idx = self._symbol_index['ETF' if market_type == 'ETF' else 'LOF'].get(symbol)
             
-            if len(result) == 0:
+            if idx is None:
                 raise Exception(f"未找到基金代码: {symbol}")
             
-            # 获取第一行数据
-            row = result.iloc[0]
+            row = df.iloc[idx]
             
             # 格式化为字典
             fund_detail = {
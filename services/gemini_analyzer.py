@@ -3,16 +3,166 @@ import os
 import json
 import httpx
 import re
-from typing import AsyncGenerator
+from functools import lru_cache
+from typing import AsyncGenerator, Optional
 from dotenv import load_dotenv
 from utils.logger import get_logger
 from utils.api_utils import APIUtils
 from datetime import datetime
 from google import genai
+from google.genai import types
 from services.ai_analyzer import AIAnalyzer
 # 获取日志器
 logger = get_logger()
 
+# 近期交易数据中发送给AI的列
+RECENT_DATA_COLUMNS = ['Open', 'Close', 'High', 'Low', 'Volume']
+
+# 所有分析器共享的HTTP连接池，连续分析时复用TLS会话，超时由每个请求单独设置
+_HTTPX_CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+)
+
+
+async def close_http_client() -> None:
+    """
+    关闭共享的HTTP连接池，应用退出时调用
+    """
+    await _HTTPX_CLIENT.aclose()
+
+
+@lru_cache(maxsize=16)
+def _get_genai_client(api_key: Optional[str], timeout: int) -> genai.Client:
+    """
+    获取Gemini客户端，相同API Key和超时时间的分析器复用同一个客户端
+    
+    每次请求都会新建分析器，客户端缓存在模块级别，避免每次分析都重新创建
+    
+    Args:
+        api_key: API Key
+        timeout: 超时时间（秒）
+        
+    Returns:
+        Gemini客户端
+    """
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            httpx_async_client=_HTTPX_CLIENT,
+            timeout=timeout * 1000
+        )
+    )
+
+_A_PROMPT = """\
+分析A股 {stock_name} {stock_code}：
+
+技术指标概要：
+{technical_summary}
+
+近30日交易数据（CSV）：
+{recent_data}
+
+请提供：
+1. 趋势分析（包含支撑位和压力位）
+2. 成交量分析及其含义
+3. 风险评估（包含波动率分析）
+4. 短期和中期目标价位
+5. 关键技术位分析
+6. 具体交易建议（包含止损位）
+
+请基于技术指标和A股市场特点进行分析，给出具体数据支持。
+"""
+
+_HK_PROMPT = """\
+分析港股 {stock_name} {stock_code}：
+
+技术指标概要：
+{technical_summary}
+
+近30日交易数据（CSV）：
+{recent_data}
+
+请提供：
+1. 趋势分析（包含支撑位和压力位，港币计价）
+2. 成交量分析及其含义
+3. 风险评估（包含波动率和港股市场特有风险）
+4. 短期和中期目标价位（港币）
+5. 关键技术位分析
+6. 具体交易建议（包含止损位）
+
+请基于技术指标和港股市场特点进行分析，给出具体数据支持。
+"""
+
+_US_PROMPT = """\
+分析美股 {stock_name} {stock_code}：
+
+技术指标概要：
+{technical_summary}
+
+近30日交易数据（CSV）：
+{recent_data}
+
+请提供：
+1. 趋势分析（包含支撑位和压力位，美元计价）
+2. 成交量分析及其含义
+3. 风险评估（包含波动率和美股市场特有风险）
+4. 短期和中期目标价位（美元）
+5. 关键技术位分析
+6. 具体交易建议（包含止损位）
+
+请基于技术指标和美股市场特点进行分析，给出具体数据支持。
+"""
+
+_CB_PROMPT = """\
+分析可转债 {stock_name} {stock_code}：
+
+技术指标概要：
+{technical_summary}
+
+近30日交易数据（CSV）：
+{recent_data}
+
+请提供：
+1. 趋势分析（包含支撑位和压力位，港币计价）
+2. 成交量分析及其含义
+3. 风险评估（包含波动率和港股市场特有风险）
+4. 短期和中期目标价位（港币）
+5. 关键技术位分析
+6. 具体交易建议（包含止损位）
+
+请基于技术指标和港股市场特点进行分析，给出具体数据支持。
+"""
+
+_FUND_PROMPT = """\
+分析基金 {stock_name} {stock_code}：
+
+技术指标概要：
+{technical_summary}
+
+近30日交易数据（CSV）：
+{recent_data}
+
+请提供：
+1. 净值走势分析（包含支撑位和压力位）
+2. 成交量分析及其对净值的影响
+3. 风险评估（包含波动率和折溢价分析）
+4. 短期和中期净值预测
+5. 关键价格位分析
+6. 申购赎回建议（包含止损位）
+
+请基于技术指标和市场表现进行分析，给出具体数据支持。
+"""
+
+# 各市场类型的分析提示模板，未知市场类型使用A股模板
+PROMPT_TEMPLATES = {
+    'A': _A_PROMPT,
+    'HK': _HK_PROMPT,
+    'US': _US_PROMPT,
+    'CB': _CB_PROMPT,
+    'ETF': _FUND_PROMPT,
+    'LOF': _FUND_PROMPT,
+}
+
 class GeminiAnalyzer(AIAnalyzer):
     """
     异步AI分析服务
@@ -40,6 +190,17 @@ class GeminiAnalyzer(AIAnalyzer):
         
         logger.debug(f"初始化GeminiAnalyzer: API_URL={self.API_URL}, API_MODEL={self.API_MODEL}, API_KEY={'已提供' if self.API_KEY else '未提供'}, API_TIMEOUT={self.API_TIMEOUT}")
     
+    def _get_client(self) -> genai.Client:
+        """
+        获取Gemini客户端，底层使用模块共享的连接池
+        
+        缺少API Key时在此抛出异常，由调用方作为分析错误返回
+        
+        Returns:
+            Gemini客户端
+        """
+        return _get_genai_client(self.API_KEY, self.API_TIMEOUT)
+    
     async def get_ai_analysis(self, df: pd.DataFrame, stock_code: str, market_type: str = 'A', stream: bool = False, stock_name:str='') -> AsyncGenerator[str, None]:
         """
         对股票数据进行AI分析
@@ -57,7 +218,7 @@ class GeminiAnalyzer(AIAnalyzer):
         try:
             logger.info(f"开始AI分析 {stock_name} {stock_code}, 流式模式: {stream}, API_MODEL: {self.API_MODEL}")
             
-            # 提取关键技术指标
+            # 提取关键技术指标，最新一行只取一次，后续均从该行读取
             latest_data = df.iloc[-1]
             
             # 计算技术指标
@@ -78,131 +239,38 @@ class GeminiAnalyzer(AIAnalyzer):
             volume_status = 'HIGH' if volume_ratio > 1.5 else ('LOW' if volume_ratio < 0.5 else 'NORMAL')
             
             # AI 分析内容
-            # 最近30天的股票数据记录
-            recent_data = df.tail(30).to_dict('records')
+            # 最近30天的股票数据记录，只保留需要的列并序列化为CSV，列名只出现一次
+            recent_columns = [col for col in RECENT_DATA_COLUMNS if col in df.columns]
+            recent_data = df[recent_columns].tail(30).round(3).to_csv(index=False).rstrip('\n')
             
             # 包含trend, volatility, volume_trend, rsi_level的字典
             technical_summary = {
-                'trend': 'upward' if df.iloc[-1]['MA5'] > df.iloc[-1]['MA20'] else 'downward',
-                'volatility': f"{df.iloc[-1]['Volatility']:.2f}%",
-                'volume_trend': 'increasing' if df.iloc[-1]['Volume_Ratio'] > 1 else 'decreasing',
-                'rsi_level': df.iloc[-1]['RSI']
+                'trend': 'upward' if latest_data['MA5'] > latest_data['MA20'] else 'downward',
+                'volatility': f"{latest_data['Volatility']:.2f}%",
+                'volume_trend': 'increasing' if latest_data['Volume_Ratio'] > 1 else 'decreasing',
+                'rsi_level': rsi
             }
             
-            # 根据市场类型调整分析提示
-            if market_type in ['ETF', 'LOF']:
-                prompt = f"""
-                分析基金 {stock_name} {stock_code}：
-
-                技术指标概要：
-                {technical_summary}
-                
-                近30日交易数据：
-                {recent_data}
-                
-                请提供：
-                1. 净值走势分析（包含支撑位和压力位）
-                2. 成交量分析及其对净值的影响
-                3. 风险评估（包含波动率和折溢价分析）
-                4. 短期和中期净值预测
-                5. 关键价格位分析
-                6. 申购赎回建议（包含止损位）
-                
-                请基于技术指标和市场表现进行分析，给出具体数据支持。
-                """
-            elif market_type == 'US':
-                prompt = f"""
-                分析美股 {stock_name} {stock_code}：
-
-                技术指标概要：
-                {technical_summary}
-                
-                近30日交易数据：
-                {recent_data}
-                
-                请提供：
-                1. 趋势分析（包含支撑位和压力位，美元计价）
-                2. 成交量分析及其含义
-                3. 风险评估（包含波动率和美股市场特有风险）
-                4. 短期和中期目标价位（美元）
-                5. 关键技术位分析
-                6. 具体交易建议（包含止损位）
-                
-                请基于技术指标和美股市场特点进行分析，给出具体数据支持。
-                """
-            elif market_type == 'HK':
-                prompt = f"""
-                分析港股 {stock_name} {stock_code}：
-
-                技术指标概要：
-                {technical_summary}
-                
-                近30日交易数据：
-                {recent_data}
-                
-                请提供：
-                1. 趋势分析（包含支撑位和压力位，港币计价）
-                2. 成交量分析及其含义
-                3. 风险评估（包含波动率和港股市场特有风险）
-                4. 短期和中期目标价位（港币）
-                5. 关键技术位分析
-                6. 具体交易建议（包含止损位）
-                
-                请基于技术指标和港股市场特点进行分析，给出具体数据支持。
-                """
-            elif market_type == 'CB':
-                prompt = f"""
-                分析可转债 {stock_name} {stock_code}：
-
-                技术指标概要：
-                {technical_summary}
-                
-                近30日交易数据：
-                {recent_data}
-                
-                请提供：
-                1. 趋势分析（包含支撑位和压力位，港币计价）
-                2. 成交量分析及其含义
-                3. 风险评估（包含波动率和港股市场特有风险）
-                4. 短期和中期目标价位（港币）
-                5. 关键技术位分析
-                6. 具体交易建议（包含止损位）
-                
-                请基于技术指标和港股市场特点进行分析，给出具体数据支持。
-                """
-            else:  # A股
-
-                prompt = f"""
-                分析A股 {stock_name} {stock_code}：
-
-                技术指标概要：
-                {technical_summary}
-                
-                近30日交易数据：
-                {recent_data}
-                
-                请提供：
-                1. 趋势分析（包含支撑位和压力位）
-                2. 成交量分析及其含义
-                3. 风险评估（包含波动率分析）
-                4. 短期和中期目标价位
-                5. 关键技术位分析
-                6. 具体交易建议（包含止损位）
-                
-                请基于技术指标和A股市场特点进行分析，给出具体数据支持。
-                """
+            # 根据市场类型选择分析提示模板
+            prompt = PROMPT_TEMPLATES.get(market_type, PROMPT_TEMPLATES['A']).format(
+                stock_name=stock_name,
+                stock_code=stock_code,
+                technical_summary=technical_summary,
+                recent_data=recent_data
+            )
 
             # 获取当前日期作为分析日期
             analysis_date = datetime.now().strftime("%Y-%m-%d")
-            client = genai.Client(api_key=self.API_KEY)
+            client = self._get_client()
 
             # logger.debug(prompt)
             
             if stream:
                 buffer = ""
                 chunk_count = 0
-                response = client.models.generate_content_stream(model=self.API_MODEL, contents=prompt)
-                for chunk in response:
+                # 使用异步客户端，等待网络数据时不阻塞事件循环
+                response = await client.aio.models.generate_content_stream(model=self.API_MODEL, contents=prompt)
+                async for chunk in response:
                     chunk_count += 1
                     buffer += chunk.text
                     
@@ -241,7 +309,7 @@ class GeminiAnalyzer(AIAnalyzer):
                     "recommendation": recommendation
                 })
             else:
-                response = client.models.generate_content(model=self.API_MODEL, contents=prompt)
+                response = await client.aio.models.generate_content(model=self.API_MODEL, contents=prompt)
                 # logger.info(f"Gemini API响应: {response.text}")
                 analysis_text = response.text
 
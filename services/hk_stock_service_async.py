@@ -1,19 +1,35 @@
-import os
+import random
 import asyncio
+import httpx
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from utils.logger import get_logger
+from utils.cache_utils import CacheUtils
+from utils.akshare_utils import get_akshare
+from utils.dataframe_utils import DataFrameUtils
+from utils.search_utils import SearchUtils
 from datetime import datetime, timedelta
-import akshare
-import requests
-import math
-
-from akshare.utils.tqdm import get_tqdm
-# from akshare.utils.func import fetch_paginated_data
 
 # 获取日志器
 logger = get_logger()
 
+# 东方财富港股行情接口，与akshare的stock_hk_spot_em相同，只请求涨跌幅、代码和名称字段
+HK_SPOT_URL = "https://72.push2.eastmoney.com/api/qt/clist/get"
+HK_SPOT_PARAMS = {
+    "pn": "1",
+    "pz": "100",
+    "po": "1",
+    "np": "1",
+    "ut": "bd1d9ddb04089700cf9c27f6f7426281",
+    "fltt": "2",
+    "invt": "2",
+    "fid": "f12",
+    "fs": "m:128 t:3,m:128 t:4,m:128 t:1,m:128 t:2",
+    "fields": "f3,f12,f14",
+}
+
 class HKStockServiceAsync:
     """
     港股服务
@@ -25,27 +41,58 @@ class HKStockServiceAsync:
         logger.debug("初始化HKStockServiceAsync")
         
         # 可选：添加缓存以减少频繁请求
-        self.cache_file = 'data/all_hk_stock.csv'
-        self.cache = None
+        self.cache_file = 'data/all_hk_stock.parquet'
         self.cache_timestamp = None
         self.cache_duration = timedelta(days=5)
+        # 股票代码 -> 行号索引，随缓存一起重建
+        self._symbol_index = {}
+        # 代码、名称及小写名称数组，搜索和详情查询直接使用，无需访问DataFrame
+        self._symbols = np.array([], dtype=object)
+        self._names = np.array([], dtype=object)
+        self._names_lower = np.array([], dtype=object)
+        # 拼接后的小写名称，子串搜索直接在整个字符串上查找
+        self._names_blob = SearchUtils.build_blob([])
+        # 缓存失效时保证只有一个请求从API刷新数据
+        self._refresh_lock = asyncio.Lock()
+        # akshare调用使用独立线程池，避免占满默认线程池影响其他阻塞调用
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='akshare')
 
-        if os.path.exists(self.cache_file):
-            df = pd.read_csv(self.cache_file, dtype={'symbol': str})
-            if len('日期') > 0:
-                str_date = df['日期'].iloc[0]
-                df.pop('日期')
-                self.cache = df 
-                date_format = '%Y-%m-%d %H:%M:%S'
-                self.cache_timestamp = datetime.strptime(str_date, date_format)
-                logger.info(f'港股缓存数据，日期：{str(self.cache_timestamp)}')
+        df, timestamp = CacheUtils.read_parquet(self.cache_file, columns=['symbol', 'name'], legacy_csv='data/all_hk_stock.csv')
+        if df is not None:
+            self._set_cache(df, timestamp)
+            logger.info(f'港股缓存数据，日期：{str(self.cache_timestamp)}')
     
+    def close(self) -> None:
+        """
+        关闭akshare线程池，在应用退出时调用
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_cache(self, df: pd.DataFrame, timestamp: datetime) -> None:
+        """
+        更新缓存数据，并重建股票代码索引
+
+        只保留搜索和详情查询使用的数组，不保留DataFrame
+        
+        Args:
+            df: 港股数据
+            timestamp: 缓存刷新时间
+        """
+        # 空值在建缓存时统一填充，搜索和详情查询直接使用
+        df = df.fillna({'name': '', 'symbol': ''})
+        self.cache_timestamp = timestamp
+        self._symbols = df['symbol'].to_numpy()
+        self._names = df['name'].to_numpy()
+        self._names_lower = np.array([name.lower() for name in self._names], dtype=object)
+        self._names_blob = SearchUtils.build_blob(self._names_lower)
+        self._symbol_index = dict(zip(self._symbols, range(len(self._symbols))))
+
     async def search_stocks(self, keyword: str) -> List[Dict[str, Any]]:
         """
         异步搜索港股代码
         
         Args:
-            keyword: 搜索关键词
+            keyword: 搜索关键词，多个关键词用逗号分隔，匹配任一关键词即可
             
         Returns:
             匹配的股票列表
@@ -53,22 +100,18 @@ class HKStockServiceAsync:
         try:
             logger.info(f"异步搜索港股: {keyword}")
 
-            df = await asyncio.to_thread(self._get_all_stocks_data)
+            await self._get_stocks_data()
 
-            # 模糊匹配搜索
-            mask = df['name'].str.contains(keyword, case=False, na=False)
-            results = df[mask]
+            # 模糊匹配搜索，找到10个匹配项后即停止扫描
+            positions = SearchUtils.match(keyword, self._names_lower, 10, self._names_blob)
+            # 匹配不足10个时，用模糊匹配补充容错结果
+            if keyword and len(positions) < 10:
+                positions += SearchUtils.fuzzy_match(keyword, self._names_lower, 10 - len(positions), exclude=set(positions))
             
-            # 格式化返回结果并处理 NaN 值
-            formatted_results = []
-            for _, row in results.iterrows():
-                formatted_results.append({
-                    'name': row['name'] if pd.notna(row['name']) else '',
-                    'symbol': str(row['symbol']) if pd.notna(row['symbol']) else '',
-                })
-                # 限制只返回前10个结果
-                if len(formatted_results) >= 10:
-                    break
+            formatted_results = [
+                {'name': self._names[i], 'symbol': self._symbols[i]}
+                for i in positions
+            ]
             
             logger.info(f"港股搜索完成，找到 {len(formatted_results)} 个匹配项（限制显示前10个）")
             return formatted_results
@@ -79,21 +122,95 @@ class HKStockServiceAsync:
             logger.exception(e)
             raise Exception(error_msg)
     
-    def _get_all_stocks_data(self) -> pd.DataFrame:
+    def _is_cache_valid(self) -> bool:
+        """
+        检查港股缓存是否存在且未过期
+        """
+        return self.cache_timestamp is not None and (datetime.now() - self.cache_timestamp) < self.cache_duration
+
+    async def _get_stocks_data(self) -> None:
+        """
+        异步获取港股数据，支持缓存
+        
+        缓存失效时只由一个请求从API刷新，并发的其他请求等待并复用刷新结果
         """
-        获取港股数据（同步方法，将被异步方法调用）
+        if self._is_cache_valid():
+            logger.debug("使用港股所有数据缓存数据")
+            return
+
+        async with self._refresh_lock:
+            # 等待锁期间缓存可能已被其他请求刷新
+            if self._is_cache_valid():
+                return
+
+            now = datetime.now()
+            loop = asyncio.get_running_loop()
+            try:
+                df = await self._fetch_all_stocks_data()
+            except Exception as e:
+                # 接口请求或解析失败时改用akshare获取
+                logger.warning(f"异步获取港股数据失败，改用akshare获取: {str(e)}")
+                df = await loop.run_in_executor(self._executor, self._get_all_stocks_data, now)
+            else:
+                # 写缓存文件是同步I/O，放到线程池中执行
+                await loop.run_in_executor(self._executor, CacheUtils.write_parquet, df, self.cache_file, now)
+            self._set_cache(df, now)
+
+    async def _fetch_all_stocks_data(self) -> pd.DataFrame:
+        """
+        异步分页请求东方财富接口获取港股数据，等待网络期间不占用线程
+        
+        Returns:
+            包含港股数据的DataFrame，行顺序与akshare一致
+        """
+        logger.debug(f"从API异步获取港股所有数据")
+
+        params = dict(HK_SPOT_PARAMS)
+        rows = []
+        total = 1
+        page = 1
+        async with httpx.AsyncClient(timeout=15) as client:
+            while len(rows) < total:
+                params["pn"] = str(page)
+                response = await client.get(HK_SPOT_URL, params=params)
+                response.raise_for_status()
+                data = response.json()["data"]
+                if not data["diff"]:
+                    break
+                rows.extend(data["diff"])
+                total = data["total"]
+                page += 1
+                if len(rows) < total:
+                    # 与akshare一致，分页请求之间随机等待，避免请求过于频繁
+                    await asyncio.sleep(random.uniform(0.5, 1.5))
+
+        # 数据为空或分页中断时抛出异常，由调用方改用akshare获取，避免缓存不完整的数据
+        if not rows or len(rows) < total:
+            raise Exception(f"港股数据不完整，获取 {len(rows)} 条，共 {total} 条")
+
+        df = pd.DataFrame(rows, columns=["f3", "f12", "f14"])
+        # 与akshare一致按涨跌幅降序排列
+        df["f3"] = pd.to_numeric(df["f3"], errors="coerce")
+        df = df.sort_values(by="f3", ascending=False, ignore_index=True)
+        df = df.rename(columns={
+            "f14": "name",
+            "f12": "symbol",
+        })[["symbol", "name"]]
+        return DataFrameUtils.compress(df, ['name', 'symbol'])
+
+    def _get_all_stocks_data(self, now: datetime) -> pd.DataFrame:
+        """
+        从API获取港股数据并写入缓存文件（同步方法，将被异步方法调用）
         
+        Args:
+            now: 缓存刷新时间
+            
         Returns:
             包含港股数据的DataFrame
         """
-        import akshare as ak
+        ak = get_akshare()
         
         try:
-            now = datetime.now()
-            if self.cache is not None and (now - self.cache_timestamp) < self.cache_duration:
-                logger.debug("使用港股所有数据缓存数据")
-                return self.cache
-            
             logger.debug(f"从API获取港股所有数据")
 
             # 获取港股数据
@@ -110,12 +227,9 @@ class HKStockServiceAsync:
                 "名称": "name",
                 "代码": "symbol",
             })
+            df = DataFrameUtils.compress(df, ['name', 'symbol'])
 
-            df['日期'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-            df.to_csv(self.cache_file, index=False)
-            df.pop('日期')
-            self.cache = df
-            self.cache_timestamp = now
+            CacheUtils.write_parquet(df, self.cache_file, now)
             return df
             
         except Exception as e:
@@ -136,11 +250,11 @@ class HKStockServiceAsync:
         try:
             logger.info(f"获取港股详情: {symbol}")
             
-            df = await asyncio.to_thread(self._get_all_stocks_data)
-            result = df.loc[df['symbol'] == symbol]
-            if len(result) == 0:
+            await self._get_stocks_data()
+            idx = self._symbol_index.get(symbol)
+            if idx is None:
                 raise Exception(f"未找到股票代码{symbol}的股票简称")
-            stock_name = result['name'].values[0]
+            stock_name = self._names[idx]
             
             # 格式化为字典
             stock_detail = {
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 import asyncio
 from typing import Dict, List, Optional, Tuple, Any
 from utils.logger import get_logger
+from utils.akshare_utils import get_akshare
 
 # 获取日志器
 logger = get_logger()
@@ -48,7 +49,7 @@ class StockDataProvider:
         同步获取股票数据的实现
         将被异步方法调用
         """
-        import akshare as ak
+        ak = get_akshare()
         
         if start_date is None:
             start_date = (datetime.now() - timedelta(days=365)).strftime('%Y%m%d')
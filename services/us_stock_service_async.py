@@ -1,8 +1,13 @@
-import os
 import asyncio
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from utils.logger import get_logger
+from utils.cache_utils import CacheUtils
+from utils.akshare_utils import get_akshare
+from utils.dataframe_utils import DataFrameUtils
+from utils.search_utils import SearchUtils
 from datetime import datetime, timedelta
 
 # 获取日志器
@@ -19,27 +24,60 @@ class USStockServiceAsync:
         logger.debug("初始化USStockServiceAsync")
         
         # 可选：添加缓存以减少频繁请求
-        self.cache_file = 'data/all_us_stock.csv'
-        self.cache = None
+        self.cache_file = 'data/all_us_stock.parquet'
         self.cache_timestamp = None
         self.cache_duration = timedelta(days=25)
+        # 股票代码 -> 行号索引，随缓存一起重建
+        self._symbol_index = {}
+        # 代码、英文名称、中文名称及小写中文名称数组，搜索和详情查询直接使用，无需访问DataFrame
+        self._symbols = np.array([], dtype=object)
+        self._names = np.array([], dtype=object)
+        self._cnames = np.array([], dtype=object)
+        self._names_lower = np.array([], dtype=object)
+        # 拼接后的小写名称，子串搜索直接在整个字符串上查找
+        self._names_blob = SearchUtils.build_blob([])
+        # 缓存失效时保证只有一个请求从API刷新数据
+        self._refresh_lock = asyncio.Lock()
+        # akshare调用使用独立线程池，避免占满默认线程池影响其他阻塞调用
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='akshare')
 
-        if os.path.exists(self.cache_file):
-            df = pd.read_csv(self.cache_file)
-            if len('日期') > 0:
-                str_date = df['日期'].iloc[0]
-                df.pop('日期')
-                self.cache = df 
-                date_format = '%Y-%m-%d %H:%M:%S'
-                self.cache_timestamp = datetime.strptime(str_date, date_format)
-                logger.info(f'美股缓存数据，日期：{str(self.cache_timestamp)}')
+        df, timestamp = CacheUtils.read_parquet(self.cache_file, columns=['name', 'cname', 'symbol'], legacy_csv='data/all_us_stock.csv')
+        if df is not None:
+            self._set_cache(df, timestamp)
+            logger.info(f'美股缓存数据，日期：{str(self.cache_timestamp)}')
     
+    def close(self) -> None:
+        """
+        关闭akshare线程池，在应用退出时调用
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_cache(self, df: pd.DataFrame, timestamp: datetime) -> None:
+        """
+        更新缓存数据，并重建股票代码索引
+
+        只保留搜索和详情查询使用的数组，不保留DataFrame
+        
+        Args:
+            df: 美股数据
+            timestamp: 缓存刷新时间
+        """
+        # 空值在建缓存时统一填充，搜索和详情查询直接使用
+        df = df.fillna({'name': '', 'cname': '', 'symbol': ''})
+        self.cache_timestamp = timestamp
+        self._symbols = df['symbol'].to_numpy()
+        self._names = df['name'].to_numpy()
+        self._cnames = df['cname'].to_numpy()
+        self._names_lower = np.array([name.lower() for name in self._cnames], dtype=object)
+        self._names_blob = SearchUtils.build_blob(self._names_lower)
+        self._symbol_index = dict(zip(self._symbols, range(len(self._symbols))))
+
     async def search_us_stocks(self, keyword: str) -> List[Dict[str, Any]]:
         """
         异步搜索美股代码
         
         Args:
-            keyword: 搜索关键词
+            keyword: 搜索关键词，多个关键词用逗号分隔，匹配任一关键词即可
             
         Returns:
             匹配的股票列表
@@ -47,23 +85,18 @@ class USStockServiceAsync:
         try:
             logger.info(f"异步搜索美股: {keyword}")
             
-            df = await asyncio.to_thread(self._get_us_all_stocks_data)
+            await self._get_cached_us_stocks_data()
             
-            # 模糊匹配搜索
-            mask = df['cname'].str.contains(keyword, case=False, na=False)
-            results = df[mask]
+            # 模糊匹配搜索，找到10个匹配项后即停止扫描
+            positions = SearchUtils.match(keyword, self._names_lower, 10, self._names_blob)
+            # 匹配不足10个时，用模糊匹配补充容错结果
+            if keyword and len(positions) < 10:
+                positions += SearchUtils.fuzzy_match(keyword, self._names_lower, 10 - len(positions), exclude=set(positions))
             
-            # 格式化返回结果并处理 NaN 值
-            formatted_results = []
-            for _, row in results.iterrows():
-                formatted_results.append({
-                    'name': row['name'] if pd.notna(row['name']) else '',
-                    'cname': row['cname'] if pd.notna(row['cname']) else '',
-                    'symbol': str(row['symbol']) if pd.notna(row['symbol']) else '',
-                })
-                # 限制只返回前10个结果
-                if len(formatted_results) >= 10:
-                    break
+            formatted_results = [
+                {'name': self._names[i], 'cname': self._cnames[i], 'symbol': self._symbols[i]}
+                for i in positions
+            ]
             
             logger.info(f"美股搜索完成，找到 {len(formatted_results)} 个匹配项（限制显示前10个）")
             return formatted_results
@@ -74,23 +107,45 @@ class USStockServiceAsync:
             logger.exception(e)
             raise Exception(error_msg)
     
-    def _get_us_all_stocks_data(self) -> pd.DataFrame:
+    def _is_cache_valid(self) -> bool:
         """
-        获取美股数据（同步方法，将被异步方法调用）
+        检查美股缓存是否存在且未过期
+        """
+        return self.cache_timestamp is not None and (datetime.now() - self.cache_timestamp) < self.cache_duration
+
+    async def _get_cached_us_stocks_data(self) -> None:
+        """
+        异步获取美股数据，支持缓存
         
-        Returns:
-            包含美股数据的DataFrame
+        缓存失效时只由一个请求从API刷新，并发的其他请求等待并复用刷新结果
         """
-        import akshare as ak
-    
-        try:
+        if self._is_cache_valid():
+            logger.debug("使用美股所有数据缓存数据")
+            return
+
+        async with self._refresh_lock:
+            # 等待锁期间缓存可能已被其他请求刷新
+            if self._is_cache_valid():
+                return
 
-            # 检查缓存是否有效
             now = datetime.now()
-            if self.cache is not None and (now - self.cache_timestamp) < self.cache_duration:
-                logger.debug("使用美股所有数据缓存数据")
-                return self.cache
+            loop = asyncio.get_running_loop()
+            df = await loop.run_in_executor(self._executor, self._get_us_all_stocks_data, now)
+            self._set_cache(df, now)
 
+    def _get_us_all_stocks_data(self, now: datetime) -> pd.DataFrame:
+        """
+        从API获取美股数据并写入缓存文件（同步方法，将被异步方法调用）
+        
+        Args:
+            now: 缓存刷新时间
+            
+        Returns:
+            包含美股数据的DataFrame
+        """
+        ak = get_akshare()
+        
+        try:
             logger.debug(f"从API获取美股所有数据")
 
             # 获取美股数据
@@ -102,14 +157,9 @@ class USStockServiceAsync:
                 "cname": "cname",
                 "symbol": "symbol"
             })
+            df = DataFrameUtils.compress(df, ['name', 'cname', 'symbol'])
 
-            df.set_index('symbol')
-            df['日期'] = str(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-            df.to_csv(self.cache_file, index=False)
-            df.pop('日期')
-            df.set_index('symbol')
-            self.cache = df
-            self.cache_timestamp = now
+            CacheUtils.write_parquet(df, self.cache_file, now)
             return df
             
         except Exception as e:
@@ -125,7 +175,7 @@ class USStockServiceAsync:
         Returns:
             包含美股数据的DataFrame
         """
-        import akshare as ak
+        ak = get_akshare()
         
         try:
             # 获取美股数据
@@ -171,11 +221,11 @@ class USStockServiceAsync:
         try:
             logger.info(f"获取美股详情: {symbol}")
             
-            df = await asyncio.to_thread(self._get_us_all_stocks_data)
-            result = df.loc[df['symbol'] == symbol]
-            if len(result) == 0:
+            await self._get_cached_us_stocks_data()
+            idx = self._symbol_index.get(symbol)
+            if idx is None:
                 raise Exception(f"未找到股票代码{symbol}的股票简称")
-            stock_name = result['cname'].values[0]
+            stock_name = self._cnames[idx]
             
             # TODO API比较耗时，按需实现
             # 使用线程池执行同步的akshare调用
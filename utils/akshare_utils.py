@@ -0,0 +1,16 @@
+import functools
+
+
+@functools.cache
+def get_akshare():
+    """
+    延迟导入akshare
+
+    akshare及其依赖导入耗时较长，只在需要从API获取数据时才导入，
+    缓存命中的请求不会触发导入
+
+    Returns:
+        akshare模块
+    """
+    import akshare
+    return akshare
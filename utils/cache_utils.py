@@ -0,0 +1,113 @@
+import os
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from typing import List, Optional, Tuple
+from utils.logger import get_logger
+
+# 获取日志器
+logger = get_logger()
+
+
+class CacheUtils:
+    # 缓存刷新时间保存在Parquet文件元数据中的键名
+    TIMESTAMP_KEY = b'refreshed_at'
+    DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+    # 读取时字符串列保持为Arrow存储，与写入前的 string[pyarrow] 类型一致
+    STRING_TYPES = {
+        pa.string(): pd.StringDtype('pyarrow'),
+        pa.large_string(): pd.StringDtype('pyarrow'),
+    }
+
+    @staticmethod
+    def write_parquet(df: pd.DataFrame, path: str, timestamp: datetime) -> None:
+        """
+        将DataFrame写入Parquet缓存文件
+
+        刷新时间写入文件元数据，而不是在每一行追加日期列；先写入临时文件再替换，
+        避免写入中断或并发写入留下不完整的缓存文件
+
+        Args:
+            df: 需要缓存的数据
+            path: 缓存文件路径
+            timestamp: 缓存刷新时间
+        """
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[CacheUtils.TIMESTAMP_KEY] = timestamp.strftime(CacheUtils.DATE_FORMAT).encode()
+        table = table.replace_schema_metadata(metadata)
+        # 临时文件名带上线程ID，并发写入时互不干扰
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            pq.write_table(table, tmp_path, compression='zstd', compression_level=3)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def read_parquet(path: str, columns: Optional[List[str]] = None, legacy_csv: Optional[str] = None) -> Tuple[Optional[pd.DataFrame], Optional[datetime]]:
+        """
+        读取Parquet缓存文件及其刷新时间
+
+        Args:
+            path: 缓存文件路径
+            columns: 需要读取的列，None表示读取全部列
+            legacy_csv: 旧版本CSV缓存文件路径，Parquet缓存不存在时先迁移该文件
+
+        Returns:
+            (DataFrame, 刷新时间)，缓存不存在或文件损坏时返回 (None, None)；
+            文件元数据中没有刷新时间时以文件修改时间作为刷新时间
+        """
+        if not os.path.exists(path) and legacy_csv is not None:
+            CacheUtils._migrate_csv(legacy_csv, path)
+
+        if not os.path.exists(path):
+            return None, None
+
+        try:
+            table = pq.read_table(path, columns=columns)
+        except (pa.ArrowInvalid, OSError) as e:
+            # 缓存文件损坏时忽略，由服务重新获取数据
+            logger.warning(f"读取缓存文件失败，忽略缓存: {path}, {str(e)}")
+            return None, None
+
+        str_date = (table.schema.metadata or {}).get(CacheUtils.TIMESTAMP_KEY)
+        if str_date is None:
+            timestamp = datetime.fromtimestamp(os.path.getmtime(path))
+        else:
+            timestamp = datetime.strptime(str_date.decode(), CacheUtils.DATE_FORMAT)
+        return table.to_pandas(types_mapper=CacheUtils.STRING_TYPES.get), timestamp
+
+    @staticmethod
+    def _migrate_csv(csv_path: str, path: str) -> None:
+        """
+        将旧版本的CSV缓存迁移为Parquet缓存
+
+        旧版本CSV在每一行追加了相同的日期列，缺少该列时以文件修改时间作为刷新时间，
+        迁移成功后删除CSV文件；CSV文件损坏时保留该文件，由下次刷新重新获取数据
+
+        Args:
+            csv_path: 旧版本CSV缓存文件路径
+            path: Parquet缓存文件路径
+        """
+        if not os.path.exists(csv_path):
+            return
+
+        try:
+            df = pd.read_csv(csv_path, dtype={'symbol': str})
+            if df.empty:
+                return
+
+            if '日期' in df.columns:
+                str_date = df.pop('日期').iloc[0]
+                timestamp = datetime.strptime(str_date, CacheUtils.DATE_FORMAT)
+            else:
+                timestamp = datetime.fromtimestamp(os.path.getmtime(csv_path))
+            CacheUtils.write_parquet(df, path, timestamp)
+        except Exception as e:
+            logger.warning(f"迁移CSV缓存文件失败，忽略该文件: {csv_path}, {str(e)}")
+            return
+        os.remove(csv_path)
@@ -0,0 +1,21 @@
+import pandas as pd
+from typing import List
+
+
+class DataFrameUtils:
+    @staticmethod
+    def compress(df: pd.DataFrame, string_columns: List[str]) -> pd.DataFrame:
+        """
+        字符串列改为Arrow存储
+
+        Arrow字符串保存在连续缓冲区中，避免每行一个Python字符串对象，
+        写入Parquet缓存时也无需再逐行转换
+
+        Args:
+            df: 需要转换的数据
+            string_columns: 需要转换的字符串列
+
+        Returns:
+            转换后的DataFrame
+        """
+        return df.astype({col: 'string[pyarrow]' for col in string_columns})
@@ -0,0 +1,148 @@
+import re
+from bisect import bisect_right
+from heapq import merge
+from itertools import groupby, islice
+from typing import Collection, List, Optional, Sequence, Tuple
+
+# rapidfuzz为可选依赖，未安装时只使用子串匹配
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = None
+    process = None
+
+
+# 多个搜索关键词之间的分隔符
+KEYWORD_SEPARATOR = re.compile(r'[,，]')
+
+
+class SearchUtils:
+    # 模糊匹配的最低相似度分数（0-100）
+    FUZZY_SCORE_CUTOFF = 70
+
+    # 拼接候选名称时使用的分隔符，名称中不会出现
+    BLOB_SEPARATOR = '\n'
+
+    @staticmethod
+    def build_blob(choices: Sequence[str]) -> Tuple[str, List[int]]:
+        """
+        将候选名称拼接为一个字符串，搜索时在整个字符串上查找关键词
+
+        Args:
+            choices: 小写的候选名称
+
+        Returns:
+            (拼接后的字符串, 每个名称在字符串中的起始位置)
+        """
+        starts = []
+        offset = 0
+        for name in choices:
+            starts.append(offset)
+            offset += len(name) + 1
+        return SearchUtils.BLOB_SEPARATOR.join(choices), starts
+
+    @staticmethod
+    def _split_keywords(keyword: str) -> List[str]:
+        """
+        拆分逗号分隔的搜索关键词，去除空白和重复项
+
+        Args:
+            keyword: 搜索关键词，多个关键词用逗号分隔
+
+        Returns:
+            小写的关键词列表，没有有效关键词时返回整个小写关键词
+        """
+        kw = keyword.lower()
+        keywords = list(dict.fromkeys(k.strip() for k in KEYWORD_SEPARATOR.split(kw) if k.strip()))
+        return keywords or [kw]
+
+    @staticmethod
+    def match(keyword: str, choices: Sequence[str], limit: int, blob: Optional[Tuple[str, List[int]]] = None) -> List[int]:
+        """
+        按关键词匹配名称，找到limit个匹配项后即停止扫描
+
+        关键词按小写子串匹配，多个关键词用逗号分隔，匹配任一关键词即可
+
+        Args:
+            keyword: 搜索关键词
+            choices: 小写的候选名称
+            limit: 最多返回的匹配数量
+            blob: build_blob 拼接的候选名称，提供时直接在拼接字符串上查找
+
+        Returns:
+            按候选顺序排列的匹配位置
+        """
+        keywords = SearchUtils._split_keywords(keyword)
+        if blob is not None and not any(SearchUtils.BLOB_SEPARATOR in kw for kw in keywords):
+            if len(keywords) == 1:
+                return SearchUtils._find_in_blob(keywords[0], blob, limit)
+            # 每个关键词各取前limit个匹配，合并后按候选顺序去重
+            found = [SearchUtils._find_in_blob(kw, blob, limit) for kw in keywords]
+            matches = (i for i, _ in groupby(merge(*found)))
+        else:
+            matches = (i for i, name in enumerate(choices) if any(kw in name for kw in keywords))
+        return list(islice(matches, limit))
+
+    @staticmethod
+    def _find_in_blob(kw: str, blob: Tuple[str, List[int]], limit: int) -> List[int]:
+        """
+        在拼接字符串上查找关键词，查找在C层完成，每个匹配项只需一次Python循环
+
+        Args:
+            kw: 小写的关键词
+            blob: build_blob 拼接的候选名称
+            limit: 最多返回的匹配数量
+
+        Returns:
+            匹配的候选位置
+        """
+        text, starts = blob
+        positions = []
+        if not starts:
+            return positions
+
+        pos = text.find(kw)
+        while pos != -1 and len(positions) < limit:
+            row = bisect_right(starts, pos) - 1
+            positions.append(row)
+            # 同一名称只计一次，从下一个名称开始继续查找
+            if row + 1 >= len(starts):
+                break
+            pos = text.find(kw, starts[row + 1])
+        return positions
+
+    @staticmethod
+    def fuzzy_match(keyword: str, choices: Sequence[str], limit: int, exclude: Collection[int] = ()) -> List[int]:
+        """
+        模糊匹配关键词，用于补充子串匹配不足的搜索结果
+
+        多个关键词用逗号分隔，分别匹配后按相似度合并；长度不超过关键词一半的名称不参与匹配，
+        避免关键词中包含的单字名称排在真正的近似结果之前
+
+        Args:
+            keyword: 搜索关键词
+            choices: 小写的候选名称
+            limit: 最多返回的匹配数量
+            exclude: 已经匹配的位置，不重复返回
+
+        Returns:
+            按相似度从高到低排列的候选位置，未安装rapidfuzz时返回空列表
+        """
+        if process is None or limit <= 0:
+            return []
+
+        scores = {}
+        for kw in SearchUtils._split_keywords(keyword):
+            # 候选名称已是小写，跳过rapidfuzz的默认预处理
+            results = process.extract(
+                kw,
+                choices,
+                scorer=fuzz.WRatio,
+                processor=None,
+                limit=None,
+                score_cutoff=SearchUtils.FUZZY_SCORE_CUTOFF
+            )
+            for _, score, idx in results:
+                if idx not in exclude and len(choices[idx]) * 2 > len(kw) and score > scores.get(idx, -1):
+                    scores[idx] = score
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
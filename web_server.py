@@ -5,12 +5,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Generator
+from contextlib import asynccontextmanager
 from services.stock_analyzer_service import StockAnalyzerService
 from services.us_stock_service_async import USStockServiceAsync
 from services.a_stock_service_async import AStockServiceAsync
 from services.hk_stock_service_async import HKStockServiceAsync
 from services.fund_service_async import FundServiceAsync
 from services.cb_stock_service_async import CBStockServiceAsync
+from services.gemini_analyzer import close_http_client
 import os
 import httpx
 import asyncio
@@ -40,10 +42,24 @@ print(LOGIN_PASSWORD)
 REQUIRE_LOGIN = bool(LOGIN_PASSWORD.strip())
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 应用退出时关闭各服务的akshare线程池
+    a_stock_service.close()
+    hk_stock_service.close()
+    us_stock_service.close()
+    fund_service.close()
+    bond_service.close()
+    # 关闭AI分析共享的HTTP连接池
+    await close_http_client()
+
+
 app = FastAPI(
     title="Stock Scanner API",
     description="异步股票分析API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 添加CORS中间件